@@ -0,0 +1,73 @@
+"""
+Compares the pure python, parallel and NumPy backends of day 1 on a
+generated depth file.
+
+Usage: python day_01/benchmark.py [line_count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, TypeVar
+
+from main import count_window_increases, read_depths, solve_file, solve_file_parallel
+
+T = TypeVar("T")
+
+
+def timed(label: str, func: Callable[[], T]) -> tuple[T, float]:
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed:8.2f}s")
+    return result, elapsed
+
+
+def generate_depths(filepath: str, line_count: int) -> None:
+    depth = 10_000
+    with open(filepath, "w") as file:
+        while line_count > 0:
+            lines = []
+            for _ in range(min(100_000, line_count)):
+                depth = max(0, depth + random.randint(-10, 10))
+                lines.append(f"{depth}\n")
+
+            file.writelines(lines)
+            line_count -= len(lines)
+
+
+def main() -> None:
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000_000
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        print(f"Generating {line_count:,} depths...")
+        generate_depths(filepath, line_count)
+
+        def python_counts() -> list[int]:
+            with open(filepath) as file:
+                return count_window_increases(read_depths(file), [1, 3])
+
+        python_result, python_total = timed("python: parse + count", python_counts)
+        parallel_result, _ = timed(
+            f"python: parallel, {os.cpu_count()} cores",
+            lambda: list(solve_file_parallel(filepath)),
+        )
+        assert python_result == parallel_result, (python_result, parallel_result)
+
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("NumPy is not installed, skipping the NumPy backend.")
+            return
+
+        # solve_file is what main() runs, parsing the file in blocks with NumPy
+        numpy_result, numpy_total = timed(
+            "numpy: parse + count", lambda: list(solve_file(filepath))
+        )
+        assert python_result == numpy_result, (python_result, numpy_result)
+        print(f"speedup, parse + count: {python_total / numpy_total:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -112,27 +112,362 @@ In this example, there are 5 sums that are larger than the previous sum.
 Consider sums of a three-measurement sliding window. How many sums are
 larger than the previous sum?
 """
+import json
+import mmap
 import os
-
-
-def part1(nums: list[int]) -> int:
+import struct
+import tempfile
+import time
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, we fall back to pure python without it
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+
+def read_depths(lines: Iterable[str]) -> Iterator[int]:
+    """Lazily parses depths from lines of text, eg. an open file."""
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield int(line)
+
+
+def part1(nums: Iterable[int]) -> int:
     count = 0
-    for i, num in enumerate(nums[1:], start=1):
-        if num > nums[i - 1]:
+    previous = None
+    for num in nums:
+        if previous is not None and num > previous:
             count += 1
 
+        previous = num
+
     return count
 
 
-def part2(nums: list[int]) -> int:
+def part2(nums: Iterable[int]) -> int:
+    # Consecutive three-measurement windows share two measurements, so
+    # comparing the window sums is the same as comparing the measurement
+    # entering the window with the one leaving it, 3 positions behind.
     count = 0
-    for i, num in enumerate(nums[3:], start=3):
-        if num > nums[i - 3]:
+    window: deque[int] = deque(maxlen=3)
+    for num in nums:
+        if len(window) == 3 and num > window[0]:
             count += 1
 
+        window.append(num)
+
     return count
 
 
+def count_window_increases(nums: Iterable[int], window_sizes: list[int]) -> list[int]:
+    """
+    Counts sliding window sum increases for every given window size, in a
+    single pass. Returns the counts in the same order as `window_sizes`.
+    """
+    if any(size < 1 for size in window_sizes):
+        raise ValueError(f"Window sizes must be positive, got {window_sizes}")
+
+    counts = [0 for _ in window_sizes]
+    if not window_sizes:
+        return counts
+
+    # Ring buffer holding the last `buffer_size` measurements.
+    buffer_size = max(window_sizes)
+    buffer = [0] * buffer_size
+    seen = 0
+    for num in nums:
+        position = seen % buffer_size
+        for index, size in enumerate(window_sizes):
+            if seen >= size and num > buffer[(position - size) % buffer_size]:
+                counts[index] += 1
+
+        buffer[position] = num
+        seen += 1
+
+    return counts
+
+
+def load_depths_numpy(filepath: str) -> "npt.NDArray[np.int64]":
+    return np.loadtxt(filepath, dtype=np.int64, ndmin=1)
+
+
+def iter_depth_chunks_numpy(
+    filepath: str,
+    block_size: int = 64 * 1024 * 1024,
+) -> Iterator["npt.NDArray[np.int64]"]:
+    """Loads the depths in a file as int64 arrays, one block of lines at a time."""
+    with open(filepath, "rb") as file:
+        partial_line = b""
+        while block := file.read(block_size):
+            block = partial_line + block
+            end = block.rfind(b"\n") + 1
+            partial_line = block[end:]
+            yield np.fromstring(block[:end], dtype=np.int64, sep=" ")
+
+        yield np.fromstring(partial_line, dtype=np.int64, sep=" ")
+
+
+def part1_numpy(depths: "npt.NDArray[np.int64]") -> int:
+    return int(np.count_nonzero(depths[1:] > depths[:-1]))
+
+
+def part2_numpy(depths: "npt.NDArray[np.int64]") -> int:
+    return int(np.count_nonzero(depths[3:] > depths[:-3]))
+
+
+# Size and modification time of the text input the cache was built from
+CACHE_HEADER = struct.Struct("<qq")
+
+
+def load_depths_cached(filepath: str) -> Union[memoryview, "array[int]"]:
+    """
+    Returns the depths in a file, caching them as packed int32s in a
+    `.depths` file next to it. Later calls memory-map the cache instead of
+    parsing the text again, until the text file's size or mtime changes.
+    """
+    cache_filepath = filepath + ".depths"
+    stat = os.stat(filepath)
+    header = CACHE_HEADER.pack(stat.st_size, stat.st_mtime_ns)
+    try:
+        with open(cache_filepath, "rb") as file:
+            if file.read(CACHE_HEADER.size) == header:
+                cache = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                return memoryview(cache)[CACHE_HEADER.size :].cast("i")
+    except FileNotFoundError:
+        pass
+
+    if np is not None:
+        loaded = load_depths_numpy(filepath)
+        # Match array("i"), which refuses depths that don't fit in an int32
+        if loaded.size and (loaded.min() < -(2**31) or loaded.max() >= 2**31):
+            raise OverflowError("depth does not fit in a 32-bit cache")
+
+        depths = array("i")
+        depths.frombytes(loaded.astype(np.int32).tobytes())
+    else:
+        with open(filepath) as file:
+            depths = array("i", read_depths(file))
+
+    # Write to a temporary file first, so a crash can't leave a broken cache
+    temp_filepath = cache_filepath + ".tmp"
+    with open(temp_filepath, "wb") as file:
+        file.write(header)
+        depths.tofile(file)
+
+    os.replace(temp_filepath, cache_filepath)
+    return depths
+
+
+def count_chunks_numpy(
+    chunks: Iterable["npt.NDArray[np.int64]"],
+) -> tuple[int, int]:
+    # Chunks are joined with the last 3 depths before them, and only the
+    # comparisons that end inside the chunk are counted.
+    count1 = count2 = 0
+    tail = np.zeros(0, dtype=np.int64)
+    for chunk in chunks:
+        joined = np.concatenate((tail, chunk))
+        count1 += part1_numpy(joined[max(len(tail) - 1, 0) :])
+        count2 += part2_numpy(joined[max(len(tail) - 3, 0) :])
+        tail = joined[-3:]
+
+    return count1, count2
+
+
+def solve_file(filepath: str, cache: bool = False) -> tuple[int, int]:
+    """
+    Returns both answers for a depth file, using NumPy if it's installed.
+    The file is read in blocks, so memory use doesn't grow with its size.
+    With `cache` set, the parsed depths are reused across runs.
+    """
+    if cache:
+        depths = load_depths_cached(filepath)
+        if np is not None:
+            depth_array = np.frombuffer(depths, dtype=np.int32).astype(np.int64)
+            return part1_numpy(depth_array), part2_numpy(depth_array)
+
+        count1, count2 = count_window_increases(depths, [1, 3])
+        return count1, count2
+
+    if np is not None:
+        return count_chunks_numpy(iter_depth_chunks_numpy(filepath))
+
+    with open(filepath) as file:
+        count1, count2 = count_window_increases(read_depths(file), [1, 3])
+
+    return count1, count2
+
+
+class ChunkCounts(NamedTuple):
+    count1: int
+    count2: int
+    head: list[int]
+    tail: list[int]
+
+
+def split_file(filepath: str, chunk_count: int) -> list[tuple[int, int]]:
+    """Splits a file into roughly equal (start, end) byte ranges on newlines."""
+    size = os.path.getsize(filepath)
+    boundaries = [0]
+    with open(filepath, "rb") as file:
+        for index in range(1, chunk_count):
+            file.seek(max(size * index // chunk_count, boundaries[-1]))
+            file.readline()  # Skip to the start of the next line
+            boundaries.append(min(file.tell(), size))
+
+    boundaries.append(size)
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end
+    ]
+
+
+def count_chunk(filepath: str, start: int, end: int) -> ChunkCounts:
+    with open(filepath, "rb") as file:
+        file.seek(start)
+        nums = [int(num) for num in file.read(end - start).split()]
+
+    return ChunkCounts(part1(nums), part2(nums), nums[:3], nums[-3:])
+
+
+def stitch_chunks(chunks: Iterable[ChunkCounts]) -> tuple[int, int]:
+    """
+    Adds up the per-chunk counts, along with the comparisons that cross
+    chunk boundaries, which need the last 3 values before each chunk.
+    """
+    count1 = count2 = 0
+    tail: list[int] = []
+    for chunk in chunks:
+        count1 += chunk.count1
+        count2 += chunk.count2
+
+        joined = tail + chunk.head
+        for index in range(len(tail), len(joined)):
+            # Only count comparisons against values from previous chunks
+            if 0 <= index - 1 < len(tail) and joined[index] > joined[index - 1]:
+                count1 += 1
+            if 0 <= index - 3 < len(tail) and joined[index] > joined[index - 3]:
+                count2 += 1
+
+        tail = (tail + chunk.tail)[-3:]
+
+    return count1, count2
+
+
+def solve_file_parallel(
+    filepath: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 16 * 1024 * 1024,
+) -> tuple[int, int]:
+    """Same as `solve_file`, but counts byte-range chunks in a process pool."""
+    workers = workers or os.cpu_count() or 1
+    chunk_count = max(workers, os.path.getsize(filepath) // chunk_size)
+    byte_ranges = split_file(filepath, chunk_count)
+    starts = [start for start, _ in byte_ranges]
+    ends = [end for _, end in byte_ranges]
+
+    with ProcessPoolExecutor(workers) as executor:
+        chunks = executor.map(count_chunk, repeat(filepath), starts, ends)
+        return stitch_chunks(chunks)
+
+
+class DepthCounter:
+    """Running part1/part2 counts for a depth file that keeps growing."""
+
+    def __init__(
+        self,
+        count1: int = 0,
+        count2: int = 0,
+        window: Iterable[int] = (),
+        offset: int = 0,
+    ) -> None:
+        self.count1 = count1
+        self.count2 = count2
+        self.window: deque[int] = deque(window, maxlen=3)
+        # Number of bytes of the depth file that have been counted so far
+        self.offset = offset
+
+    def feed(self, nums: Iterable[int]) -> None:
+        window = self.window
+        for num in nums:
+            if window and num > window[-1]:
+                self.count1 += 1
+            if len(window) == 3 and num > window[0]:
+                self.count2 += 1
+
+            window.append(num)
+
+    def update(self, filepath: str, block_size: int = 1024 * 1024) -> None:
+        """Counts the lines appended to the file since the last update."""
+        if os.path.getsize(filepath) < self.offset:
+            raise ValueError(f"{filepath} shrank since the last update")
+
+        with open(filepath, "rb") as file:
+            file.seek(self.offset)
+            partial_line = b""
+            while block := file.read(block_size):
+                block = partial_line + block
+                end = block.rfind(b"\n") + 1
+                self.feed(int(num) for num in block[:end].split())
+                self.offset += end
+                # A partially written last line is left for the next update
+                partial_line = block[end:]
+
+    def save(self, filepath: str) -> None:
+        state = {
+            "count1": self.count1,
+            "count2": self.count2,
+            "window": list(self.window),
+            "offset": self.offset,
+        }
+        with open(filepath, "w") as file:
+            json.dump(state, file)
+
+    @classmethod
+    def load(cls, filepath: str) -> "DepthCounter":
+        with open(filepath) as file:
+            state = json.load(file)
+
+        return cls(**state)
+
+
+def follow(
+    filepath: str,
+    state_filepath: str,
+    interval: float = 1.0,
+) -> Iterator[tuple[int, int]]:
+    """
+    Yields the latest counts of a growing depth file every `interval`
+    seconds. The counter is persisted to `state_filepath` after every
+    update, so that following can resume where it left off.
+    """
+    if os.path.exists(state_filepath):
+        counter = DepthCounter.load(state_filepath)
+    else:
+        counter = DepthCounter()
+
+    while True:
+        counter.update(filepath)
+        counter.save(state_filepath)
+        yield counter.count1, counter.count2
+        time.sleep(interval)
+
+
 test_data = """\
 199
 200
@@ -157,13 +492,115 @@ def test_part2() -> None:
     assert part2(nums) == 5
 
 
-def main() -> None:
-    with open(os.path.join(os.path.dirname(__file__), "input")) as file:
-        data = file.read()
+def test_streaming() -> None:
+    lines = iter(test_data.splitlines(keepends=True))
+    assert part1(read_depths(lines)) == 7
+    assert part2(read_depths(test_data.splitlines())) == 5
+
+
+def test_count_window_increases() -> None:
+    nums = [int(num) for num in test_data.split()]
+    assert count_window_increases(nums, [1, 3, 5, 10, 60]) == [7, 5, 5, 0, 0]
+    assert count_window_increases(iter(nums), [3, 1]) == [5, 7]
+    assert count_window_increases(nums, []) == []
+
+
+def test_numpy() -> None:
+    if np is None:
+        return
+
+    depths = np.array([int(num) for num in test_data.split()], dtype=np.int64)
+    assert part1_numpy(depths) == 7
+    assert part2_numpy(depths) == 5
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        with open(filepath, "w") as file:
+            file.write(test_data.rstrip("\n"))
+
+        for block_size in range(1, 12):
+            chunks = iter_depth_chunks_numpy(filepath, block_size)
+            assert count_chunks_numpy(chunks) == (7, 5)
+
+
+def test_parallel() -> None:
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        with open(filepath, "w") as file:
+            file.write(test_data)
+
+        for chunk_count in range(1, 12):
+            chunks = [
+                count_chunk(filepath, start, end)
+                for start, end in split_file(filepath, chunk_count)
+            ]
+            assert stitch_chunks(chunks) == (7, 5)
 
-    nums = [int(num) for num in data.split()]
-    print(part1(nums))
-    print(part2(nums))
+        assert solve_file_parallel(filepath, workers=2, chunk_size=8) == (7, 5)
+
+
+def test_depth_counter() -> None:
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        state_filepath = os.path.join(tempdir, "state.json")
+
+        # Split partway through a line, which shouldn't be counted yet
+        split_index = test_data.index("240") + 1
+        with open(filepath, "w") as file:
+            file.write(test_data[:split_index])
+
+        counter = DepthCounter()
+        counter.update(filepath)
+        assert (counter.count1, counter.count2) == (4, 1)
+        counter.save(state_filepath)
+
+        with open(filepath, "a") as file:
+            file.write(test_data[split_index:])
+
+        counter = DepthCounter.load(state_filepath)
+        counter.update(filepath, block_size=4)
+        assert (counter.count1, counter.count2) == (7, 5)
+        assert counter.offset == len(test_data)
+
+        assert next(follow(filepath, state_filepath)) == (7, 5)
+
+
+def test_depth_cache() -> None:
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        with open(filepath, "w") as file:
+            file.write(test_data)
+
+        nums = [int(num) for num in test_data.split()]
+        assert list(load_depths_cached(filepath)) == nums
+        assert os.path.exists(filepath + ".depths")
+        assert isinstance(load_depths_cached(filepath), memoryview)
+        assert solve_file(filepath, cache=True) == (7, 5)
+        assert solve_file(filepath) == (7, 5)
+
+        with open(filepath, "a") as file:
+            file.write("264\n")
+
+        assert list(load_depths_cached(filepath)) == nums + [264]
+        assert solve_file(filepath, cache=True) == (8, 5)
+
+        with open(filepath, "w") as file:
+            file.write("3000000000\n1\n2\n")
+
+        assert solve_file(filepath) == (1, 0)
+        try:
+            solve_file(filepath, cache=True)
+        except OverflowError:
+            pass
+        else:
+            raise AssertionError("depths past int32 should not be cached")
+
+
+def main() -> None:
+    filepath = os.path.join(os.path.dirname(__file__), "input")
+    count1, count2 = solve_file(filepath)
+    print(count1)
+    print(count2)
 
 
 if __name__ == "__main__":
@@ -78,6 +78,13 @@ final depth?
 """
 
 import os
+import struct
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import compress, repeat
+from typing import MutableSequence, NamedTuple, Optional
 
 
 def part1(data: str) -> int:
@@ -113,6 +120,231 @@ def part2(data: str) -> int:
     return depth * position
 
 
+def solve(data: str) -> tuple[int, int]:
+    """Returns the answers to both parts, parsing each command only once."""
+    # Part 1's depth moves exactly like part 2's aim, so the two parts
+    # only differ in how part 2's depth is updated.
+    position = aim = depth = 0
+    for instruction in data.splitlines():
+        direction, _, distance_str = instruction.partition(" ")
+        distance = int(distance_str)
+
+        # The directions all start with different letters
+        first_letter = direction[0]
+        if first_letter == "f":
+            position += distance
+            depth += aim * distance
+        elif first_letter == "d":
+            aim += distance
+        elif first_letter == "u":
+            aim -= distance
+
+    return aim * position, depth * position
+
+
+# Opcodes of a compiled course. "up X" is compiled to a DOWN of -X.
+FORWARD = 0
+DOWN = 1
+
+
+class Course(NamedTuple):
+    opcodes: "array[int]"
+    operands: "array[int]"
+
+    def to_bytes(self) -> bytes:
+        count = struct.pack("<q", len(self.opcodes))
+        return count + self.opcodes.tobytes() + self.operands.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Course":
+        (count,) = struct.unpack_from("<q", data)
+        opcodes = array("b")
+        operands = array("q")
+        opcodes_end = 8 + count * opcodes.itemsize
+        opcodes.frombytes(data[8:opcodes_end])
+        operands.frombytes(data[opcodes_end:])
+        return cls(opcodes, operands)
+
+
+def compile_course(data: str) -> Course:
+    opcodes = array("b")
+    operands = array("q")
+    for instruction in data.splitlines():
+        direction, _, distance_str = instruction.partition(" ")
+        distance = int(distance_str)
+
+        if direction == "forward":
+            opcodes.append(FORWARD)
+            operands.append(distance)
+        elif direction == "down":
+            opcodes.append(DOWN)
+            operands.append(distance)
+        elif direction == "up":
+            opcodes.append(DOWN)
+            operands.append(-distance)
+        else:
+            raise ValueError(f"Unexpected {direction=}")
+
+    return Course(opcodes, operands)
+
+
+def run_part1(course: Course, depth: int = 0, position: int = 0) -> int:
+    # DOWN is 1, so compress() picks out exactly the depth changes
+    depth_change = sum(compress(course.operands, course.opcodes))
+    position_change = sum(course.operands) - depth_change
+    return (depth + depth_change) * (position + position_change)
+
+
+def run_part2(course: Course, depth: int = 0, position: int = 0, aim: int = 0) -> int:
+    for opcode, distance in zip(course.opcodes, course.operands):
+        if opcode == FORWARD:
+            position += distance
+            depth += aim * distance
+        else:
+            aim += distance
+
+    return depth * position
+
+
+class Transform(NamedTuple):
+    """
+    The change a run of part 2 commands makes, starting from zero aim.
+    Starting with an aim `a` instead only adds `a * position` to the depth.
+    """
+
+    aim: int = 0
+    depth: int = 0
+    position: int = 0
+
+    def then(self, other: "Transform") -> "Transform":
+        return Transform(
+            aim=self.aim + other.aim,
+            depth=self.depth + other.depth + self.aim * other.position,
+            position=self.position + other.position,
+        )
+
+
+def summarize(data: str) -> Transform:
+    aim = depth = position = 0
+    for instruction in data.splitlines():
+        direction, _, distance_str = instruction.partition(" ")
+        distance = int(distance_str)
+
+        if direction == "forward":
+            position += distance
+            depth += aim * distance
+        elif direction == "down":
+            aim += distance
+        elif direction == "up":
+            aim -= distance
+
+    return Transform(aim, depth, position)
+
+
+def split_file(filepath: str, chunk_count: int) -> list[tuple[int, int]]:
+    """Splits a file into roughly equal (start, end) byte ranges on newlines."""
+    size = os.path.getsize(filepath)
+    boundaries = [0]
+    with open(filepath, "rb") as file:
+        for index in range(1, chunk_count):
+            file.seek(max(size * index // chunk_count, boundaries[-1]))
+            file.readline()  # Skip to the start of the next line
+            boundaries.append(min(file.tell(), size))
+
+    boundaries.append(size)
+    return [
+        (start, end) for start, end in zip(boundaries, boundaries[1:]) if start < end
+    ]
+
+
+def summarize_chunk(filepath: str, start: int, end: int) -> Transform:
+    with open(filepath, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start).decode()
+
+    return summarize(data)
+
+
+def part2_parallel(
+    filepath: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 16 * 1024 * 1024,
+) -> int:
+    """
+    Same as `part2`, but summarizes byte-range chunks of the file in a
+    process pool, and then composes the summaries in order.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunk_count = max(workers, os.path.getsize(filepath) // chunk_size)
+    byte_ranges = split_file(filepath, chunk_count)
+    starts = [start for start, _ in byte_ranges]
+    ends = [end for _, end in byte_ranges]
+
+    with ProcessPoolExecutor(workers) as executor:
+        transforms = executor.map(summarize_chunk, repeat(filepath), starts, ends)
+        total = reduce(Transform.then, transforms, Transform())
+
+    return total.depth * total.position
+
+
+def _append_prefix(prefixes: MutableSequence[int], value: int) -> MutableSequence[int]:
+    """
+    Appends to an int64 array of prefix sums, switching to a list once a sum
+    gets too big for int64. Returns the sequence to keep appending to.
+    """
+    try:
+        prefixes.append(value)
+    except OverflowError:
+        prefixes = list(prefixes)
+        prefixes.append(value)
+
+    return prefixes
+
+
+class PositionIndex:
+    """
+    Prefix sums of the aim, position and aim-weighted depth after every
+    command of a course, for answering part 2 queries in O(1).
+
+    The sums are stored as int64 arrays, and moved to plain lists if they
+    outgrow int64, since the aim-weighted depth grows quadratically.
+    """
+
+    def __init__(self, course: Course) -> None:
+        self.aims: MutableSequence[int] = array("q", [0])
+        self.depths: MutableSequence[int] = array("q", [0])
+        self.positions: MutableSequence[int] = array("q", [0])
+
+        aim = depth = position = 0
+        for opcode, distance in zip(course.opcodes, course.operands):
+            if opcode == FORWARD:
+                position += distance
+                depth += aim * distance
+            else:
+                aim += distance
+
+            self.aims = _append_prefix(self.aims, aim)
+            self.depths = _append_prefix(self.depths, depth)
+            self.positions = _append_prefix(self.positions, position)
+
+    def __len__(self) -> int:
+        """Number of commands in the course."""
+        return len(self.aims) - 1
+
+    def at(self, step: int) -> Transform:
+        """Returns the submarine's state after the first `step` commands."""
+        return Transform(self.aims[step], self.depths[step], self.positions[step])
+
+    def between(self, start: int, end: int) -> Transform:
+        """Returns the change made by the commands from `start` to `end`."""
+        position = self.positions[end] - self.positions[start]
+        return Transform(
+            aim=self.aims[end] - self.aims[start],
+            depth=self.depths[end] - self.depths[start] - self.aims[start] * position,
+            position=position,
+        )
+
+
 test_data = """\
 forward 5
 down 5
@@ -131,12 +363,70 @@ def test_part2() -> None:
     assert part2(test_data) == 900
 
 
+def test_solve() -> None:
+    assert solve(test_data) == (150, 900)
+
+
+def test_compiled_course() -> None:
+    course = compile_course(test_data)
+    assert course.opcodes.tolist() == [0, 1, 0, 1, 1, 0]
+    assert course.operands.tolist() == [5, 5, 8, -3, 8, 2]
+    assert run_part1(course) == 150
+    assert run_part2(course) == 900
+
+    course = Course.from_bytes(course.to_bytes())
+    assert run_part1(course) == 150
+    assert run_part2(course) == 900
+    assert run_part1(course, depth=10, position=5) == 20 * 20
+    assert run_part2(course, aim=1) == 75 * 15
+
+
+def test_parallel() -> None:
+    lines = test_data.splitlines(keepends=True)
+    for split_index in range(len(lines) + 1):
+        first = summarize("".join(lines[:split_index]))
+        second = summarize("".join(lines[split_index:]))
+        assert first.then(second) == summarize(test_data)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        with open(filepath, "w") as file:
+            file.write(test_data)
+
+        assert part2_parallel(filepath, workers=2, chunk_size=10) == 900
+
+
+def test_position_index() -> None:
+    index = PositionIndex(compile_course(test_data))
+    assert len(index) == 6
+    assert index.at(0) == Transform(0, 0, 0)
+    assert index.at(3) == Transform(aim=5, depth=40, position=13)
+    final = index.at(len(index))
+    assert final.depth * final.position == 900
+
+    lines = test_data.splitlines()
+    for start in range(len(lines) + 1):
+        for end in range(start, len(lines) + 1):
+            expected = summarize("\n".join(lines[start:end]))
+            assert index.between(start, end) == expected
+
+    # The aim-weighted depth here goes past int64
+    data = "down 1000000000\n" + "forward 1000000000\n" * 20
+    index = PositionIndex(compile_course(data))
+    final = index.at(len(index))
+    assert final.depth * final.position == part2(data)
+    assert final.depth * final.position == run_part2(compile_course(data))
+    assert isinstance(index.depths, list)
+    assert isinstance(index.positions, array)
+
+
 def main() -> None:
     with open(os.path.join(os.path.dirname(__file__), "input")) as file:
         data = file.read()
 
-    print(part1(data))
-    print(part2(data))
+    answer1, answer2 = solve(data)
+    print(answer1)
+    print(answer2)
 
 
 if __name__ == "__main__":
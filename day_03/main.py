@@ -126,15 +126,107 @@ What is the life support rating of the submarine? (Be sure to represent
 your answer in decimal, not binary.)
 """
 import os
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import repeat
+from typing import Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, we fall back to pure python without it
+    np = None  # type: ignore[assignment]
+
+
+def parse_report(data: str) -> tuple[int, Sequence[int]]:
+    """
+    Returns the bit width of the report, and its numbers. Reports up to
+    64 bits wide are packed into an array of machine words.
+    """
+    lines = data.split()
+    width = len(lines[0]) if lines else 0
+    nums = map(int, lines, repeat(2))
+    if width <= 64:
+        return width, array("Q", nums)
+
+    return width, list(nums)
+
+
+def column_counts(width: int, nums: Sequence[int]) -> list[int]:
+    """Returns how many of the numbers have a 1 in each column, left to right."""
+    if np is not None and isinstance(nums, array) and len(nums) > 0:
+        return _column_counts_numpy(width, nums)
+
+    # Every distinct number gets its bits spread out into fields wide enough
+    # to hold any count, so that adding the spread numbers together sums up
+    # all the columns at once. Spreading is done a byte at a time.
+    field_width = len(nums).bit_length()
+    field_mask = (1 << field_width) - 1
+    spread_byte = [
+        sum(1 << (field_width * bit) for bit in range(8) if byte & (1 << bit))
+        for byte in range(256)
+    ]
+    byte_count = (width + 7) // 8
+
+    total = 0
+    for num, count in Counter(nums).items():
+        spread = 0
+        for byte_index in range(byte_count):
+            byte = (num >> (8 * byte_index)) & 0xFF
+            spread |= spread_byte[byte] << (8 * field_width * byte_index)
+
+        total += spread * count
+
+    return [
+        (total >> (field_width * column)) & field_mask
+        for column in range(width - 1, -1, -1)
+    ]
+
+
+def _column_counts_numpy(width: int, nums: "array[int]") -> list[int]:
+    # Big endian bytes, so that unpacking puts the most significant bit first
+    words = np.frombuffer(nums, dtype=np.uint64).astype(">u8")
+    counts = np.zeros(64, dtype=np.int64)
+    chunk_size = 1 << 20
+    for start in range(0, len(words), chunk_size):
+        chunk = words[start : start + chunk_size].view(np.uint8)
+        bits = np.unpackbits(chunk.reshape(-1, 8), axis=1)
+        counts += bits.sum(axis=0, dtype=np.int64)
+
+    return [int(count) for count in counts[64 - width :]]
+
+
+def text_column_counts(data: str) -> Optional[tuple[int, list[int]]]:
+    """
+    Returns the row count and the 1 count of each column, read straight from
+    the report's text without building a string per row. Returns None if the
+    rows aren't all the same width.
+    """
+    text = data if data.endswith("\n") else data + "\n"
+    width = text.find("\n")
+    stride = width + 1
+    if width <= 0 or not set(text[:width]) <= {"0", "1"}:
+        return None
+    # Every row has to end exactly where its newline is expected
+    if len(text) % stride or text[width::stride].strip("\n"):
+        return None
+
+    row_count = len(text) // stride
+    if np is not None:
+        rows = np.frombuffer(text.encode(), dtype=np.uint8).reshape(row_count, stride)
+        counts = (rows[:, :width] == ord("1")).sum(axis=0)
+        return row_count, [int(count) for count in counts]
+
+    return row_count, [text[column::stride].count("1") for column in range(width)]
 
 
 def part1(data: str) -> int:
-    nums = data.splitlines()
-    counts = [0 for _ in nums[0]]
-    for bits in nums:
-        for index, bit in enumerate(bits):
-            if bit == "1":
-                counts[index] += 1
+    text_counts = text_column_counts(data)
+    if text_counts is not None:
+        row_count, counts = text_counts
+    else:
+        width, nums = parse_report(data)
+        row_count, counts = len(nums), column_counts(width, nums)
 
     gamma = epsilon = 0
     for count in counts:
@@ -143,7 +235,7 @@ def part1(data: str) -> int:
 
         # The question doesn't clarify what to do when count == n/2.
         # But, both > and >= give the same answer here, so it's fine.
-        if count > len(nums) / 2:
+        if count > row_count / 2:
             gamma += 1
         else:
             epsilon += 1
@@ -151,38 +243,281 @@ def part1(data: str) -> int:
     return gamma * epsilon
 
 
-def part2(data: str) -> int:
-    nums = data.splitlines()
-
-    oxygen_remaining_numbers = co2_remaining_numbers = nums
-    index = 0
-    while len(oxygen_remaining_numbers) > 1:
-        bits = [num[index] for num in oxygen_remaining_numbers]
-        if bits.count("1") >= len(bits) / 2:
-            bit_to_keep = "1"
-        else:
-            bit_to_keep = "0"
+class BitTrie:
+    """
+    Binary trie of fixed width numbers, stored in flat arrays. Each node
+    keeps the count of numbers inserted below it.
+    """
+
+    # Node 0 stands in for every missing child, and is always empty.
+    NULL = 0
+    ROOT = 1
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        # The child of `node` for `bit` is at `children[2 * node + bit]`
+        self.children = array("i", [0, 0, 0, 0])
+        self.counts = array("i", [0, 0])
+
+    def __len__(self) -> int:
+        return self.counts[self.ROOT]
+
+    def insert(self, num: int) -> None:
+        children, counts = self.children, self.counts
+        node = self.ROOT
+        counts[node] += 1
+        for shift in range(self.width - 1, -1, -1):
+            slot = 2 * node + ((num >> shift) & 1)
+            if children[slot] == self.NULL:
+                children[slot] = len(counts)
+                children.extend((0, 0))
+                counts.append(0)
+
+            node = children[slot]
+            counts[node] += 1
+
+    def _path(self, num: int) -> list[int]:
+        """Returns the nodes along the path of `num`, below the root."""
+        children = self.children
+        node = self.ROOT
+        path = []
+        for shift in range(self.width - 1, -1, -1):
+            node = children[2 * node + ((num >> shift) & 1)]
+            path.append(node)
+
+        return path
+
+    def remove(self, num: int) -> None:
+        path = self._path(num)
+        counts = self.counts
+        if counts[path[-1] if path else self.ROOT] == 0:
+            raise ValueError(f"{num} is not in the trie")
+
+        counts[self.ROOT] -= 1
+        for node in path:
+            counts[node] -= 1
+
+    def _find_rating(self, keep_most_common: bool) -> int:
+        if len(self) == 0:
+            raise ValueError("Can't find a rating in an empty report")
+
+        children, counts = self.children, self.counts
+        node = self.ROOT
+        num = 0
+        for _ in range(self.width):
+            zeros = counts[children[2 * node]]
+            ones = counts[children[2 * node + 1]]
+            # Once a bit is missing entirely, there's only one way to go.
+            if zeros == 0:
+                bit = 1
+            elif ones == 0:
+                bit = 0
+            elif keep_most_common:
+                bit = 1 if ones >= zeros else 0
+            else:
+                bit = 0 if zeros <= ones else 1
+
+            num = (num << 1) | bit
+            node = children[2 * node + bit]
+
+        return num
+
+    def oxygen_rating(self) -> int:
+        return self._find_rating(keep_most_common=True)
+
+    def co2_rating(self) -> int:
+        return self._find_rating(keep_most_common=False)
 
-        oxygen_remaining_numbers = [
-            num for num in oxygen_remaining_numbers if num[index] == bit_to_keep
+
+def part2(data: str) -> int:
+    # Building a BitTrie costs a node per bit of every row, which is only
+    # worth it when numbers get added and removed, like in DiagnosticReport.
+    return part2_sorted(data)
+
+
+class DiagnosticReport:
+    """
+    A report that numbers can be added to and removed from, in O(width),
+    while keeping all four rates and ratings up to date.
+    """
+
+    def __init__(self, width: int) -> None:
+        self.width = width
+        # Count of 1 bits in each column, left to right
+        self.counts = [0 for _ in range(width)]
+        self.trie = BitTrie(width)
+
+    @classmethod
+    def from_data(cls, data: str) -> "DiagnosticReport":
+        width, nums = parse_report(data)
+        report = cls(width)
+        for num in nums:
+            report.add(num)
+
+        return report
+
+    def __len__(self) -> int:
+        return len(self.trie)
+
+    def add(self, num: int) -> None:
+        self.trie.insert(num)
+        for column in range(self.width):
+            if (num >> (self.width - 1 - column)) & 1:
+                self.counts[column] += 1
+
+    def remove(self, num: int) -> None:
+        self.trie.remove(num)
+        for column in range(self.width):
+            if (num >> (self.width - 1 - column)) & 1:
+                self.counts[column] -= 1
+
+    def gamma_rate(self) -> int:
+        gamma = 0
+        for count in self.counts:
+            gamma <<= 1
+            if count > len(self) / 2:
+                gamma += 1
+
+        return gamma
+
+    def epsilon_rate(self) -> int:
+        return ~self.gamma_rate() & ((1 << self.width) - 1)
+
+    def oxygen_rating(self) -> int:
+        return self.trie.oxygen_rating()
+
+    def co2_rating(self) -> int:
+        return self.trie.co2_rating()
+
+
+class PackedReport:
+    """
+    Column-major storage for very wide reports. Each column is packed into
+    a bytearray, as a big endian number whose most significant bit is row 0.
+    """
+
+    def __init__(self, columns: list[bytearray], row_count: int) -> None:
+        self.columns = columns
+        self.row_count = row_count
+
+    @classmethod
+    def from_data(cls, data: str) -> "PackedReport":
+        lines = data.split()
+        byte_count = (len(lines) + 7) // 8
+        columns = [
+            bytearray(int("".join(column), base=2).to_bytes(byte_count, "big"))
+            for column in zip(*lines)
         ]
-        index += 1
+        return cls(columns, len(lines))
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def column_counts(self) -> list[int]:
+        return [int.from_bytes(column, "big").bit_count() for column in self.columns]
+
+    def row(self, index: int) -> int:
+        # Position of the row's bit, counting bytes and bits from the end
+        byte_offset, bit = divmod(self.row_count - 1 - index, 8)
+        byte_index = len(self.columns[0]) - 1 - byte_offset if self.columns else 0
+        bits = "".join(
+            "1" if column[byte_index] & (1 << bit) else "0" for column in self.columns
+        )
+        return int(bits, base=2) if bits else 0
+
+    def gamma_rate(self) -> int:
+        bits = "".join(
+            "1" if count > self.row_count / 2 else "0"
+            for count in self.column_counts()
+        )
+        return int(bits, base=2) if bits else 0
+
+    def epsilon_rate(self) -> int:
+        return ~self.gamma_rate() & ((1 << len(self.columns)) - 1)
+
+    def _find_rating(self, keep_most_common: bool) -> int:
+        if self.row_count == 0:
+            raise ValueError("Can't find a rating in an empty report")
+
+        # Rows that are still left, with the same layout as the columns
+        remaining = (1 << self.row_count) - 1
+        for column in self.columns:
+            if remaining & (remaining - 1) == 0:
+                break
+
+            column_bits = int.from_bytes(column, "big")
+            remaining_ones = remaining & column_bits
+            ones = remaining_ones.bit_count()
+            zeros = remaining.bit_count() - ones
+            if zeros == 0:
+                bit = 1
+            elif ones == 0:
+                bit = 0
+            elif keep_most_common:
+                bit = 1 if ones >= zeros else 0
+            else:
+                bit = 0 if zeros <= ones else 1
+
+            if bit:
+                remaining = remaining_ones
+            else:
+                remaining &= ~column_bits
+
+        return self.row(self.row_count - remaining.bit_length())
+
+    def oxygen_rating(self) -> int:
+        return self._find_rating(keep_most_common=True)
+
+    def co2_rating(self) -> int:
+        return self._find_rating(keep_most_common=False)
+
+
+def _find_rating_sorted(
+    width: int,
+    sorted_nums: Sequence[int],
+    keep_most_common: bool,
+) -> int:
+    # The numbers left are always sorted_nums[lo:hi], which share all the
+    # bits above `shift`. So the ones with a 0 at `shift` come first.
+    lo, hi = 0, len(sorted_nums)
+    prefix = 0
+    for shift in range(width - 1, -1, -1):
+        if hi - lo <= 1:
+            break
+
+        mid = bisect_left(sorted_nums, prefix | (1 << shift), lo, hi)
+        zeros, ones = mid - lo, hi - mid
+        if zeros == 0:
+            bit = 1
+        elif ones == 0:
+            bit = 0
+        elif keep_most_common:
+            bit = 1 if ones >= zeros else 0
+        else:
+            bit = 0 if zeros <= ones else 1
 
-    index = 0
-    while len(co2_remaining_numbers) > 1:
-        bits = [num[index] for num in co2_remaining_numbers]
-        if bits.count("0") <= len(bits) / 2:
-            bit_to_keep = "0"
+        if bit:
+            lo = mid
+            prefix |= 1 << shift
         else:
-            bit_to_keep = "1"
+            hi = mid
+
+    return int(sorted_nums[lo])
 
-        co2_remaining_numbers = [
-            num for num in co2_remaining_numbers if num[index] == bit_to_keep
-        ]
-        index += 1
 
-    oxygen_rating = int(oxygen_remaining_numbers[0], 2)
-    co2_rating = int(co2_remaining_numbers[0], 2)
+def part2_sorted(data: str) -> int:
+    """Finds both ratings by narrowing down a window of the sorted numbers."""
+    width, nums = parse_report(data)
+    sorted_nums: Sequence[int]
+    if np is not None and isinstance(nums, array):
+        # Sorts the copied array's buffer in place
+        sorted_nums = array("Q", nums)
+        np.frombuffer(sorted_nums, dtype=np.uint64).sort()
+    else:
+        sorted_nums = sorted(nums)
+
+    oxygen_rating = _find_rating_sorted(width, sorted_nums, keep_most_common=True)
+    co2_rating = _find_rating_sorted(width, sorted_nums, keep_most_common=False)
     return oxygen_rating * co2_rating
 
 
@@ -210,6 +545,82 @@ def test_part2() -> None:
     assert part2(test_data) == 230
 
 
+def test_bit_trie() -> None:
+    width, nums = parse_report(test_data)
+    trie = BitTrie(width)
+    for num in nums:
+        trie.insert(num)
+
+    assert len(trie) == 12
+    assert trie.oxygen_rating() == 0b10111
+    assert trie.co2_rating() == 0b01010
+
+
+def test_part2_sorted() -> None:
+    assert part2_sorted(test_data) == 230
+
+
+def test_diagnostic_report() -> None:
+    report = DiagnosticReport.from_data(test_data)
+    assert len(report) == 12
+    assert report.gamma_rate() * report.epsilon_rate() == 198
+    assert report.oxygen_rating() * report.co2_rating() == 230
+
+    extra = [0b11111, 0b11110, 0b11100]
+    for num in extra:
+        report.add(num)
+
+    data_with_extra = test_data + "".join(f"{num:05b}\n" for num in extra)
+    assert report.gamma_rate() * report.epsilon_rate() == part1(data_with_extra)
+    assert report.oxygen_rating() * report.co2_rating() == part2(data_with_extra)
+
+    for num in extra:
+        report.remove(num)
+
+    assert report.gamma_rate() * report.epsilon_rate() == 198
+    assert report.oxygen_rating() * report.co2_rating() == 230
+
+    try:
+        report.remove(0b11111)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Removing a missing number should fail")
+
+
+def test_packed_report() -> None:
+    report = PackedReport.from_data(test_data)
+    assert len(report) == 12
+    assert report.column_counts() == [7, 5, 8, 7, 5]
+    _, nums = parse_report(test_data)
+    assert [report.row(index) for index in range(12)] == list(nums)
+    assert report.gamma_rate() * report.epsilon_rate() == 198
+    assert report.oxygen_rating() * report.co2_rating() == 230
+
+    wide_data = "".join(line * 20 + "\n" for line in test_data.splitlines())
+    report = PackedReport.from_data(wide_data)
+    assert report.gamma_rate() * report.epsilon_rate() == part1(wide_data)
+    assert report.oxygen_rating() * report.co2_rating() == part2(wide_data)
+
+
+def test_text_column_counts() -> None:
+    assert text_column_counts(test_data) == (12, [7, 5, 8, 7, 5])
+    assert text_column_counts(test_data.rstrip("\n")) == (12, [7, 5, 8, 7, 5])
+    assert text_column_counts("101\n11\n") is None
+
+
+def test_column_counts() -> None:
+    width, nums = parse_report(test_data)
+    expected = [7, 5, 8, 7, 5]
+    assert column_counts(width, nums) == expected
+    assert column_counts(width, list(nums)) == expected
+
+    wide_data = "".join(line * 20 + "\n" for line in test_data.splitlines())
+    width, nums = parse_report(wide_data)
+    assert width == 100
+    assert column_counts(width, nums) == expected * 20
+
+
 def main() -> None:
     with open(os.path.join(os.path.dirname(__file__), "input")) as file:
         data = file.read()
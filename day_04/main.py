@@ -96,91 +96,327 @@ Figure out which board will win last. Once it wins, what would its final
 score be?
 """
 import os
-from dataclasses import dataclass
-
-
-@dataclass
-class Cell:
-    value: int
-    marked: bool = False
-
-
-BoardRow = list[Cell]
-Board = list[BoardRow]
+import tempfile
+from array import array
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    DefaultDict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    TextIO,
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, we fall back to pure python without it
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    import numpy.typing as npt
+
+
+BOARD_SIZE = 5
+ROW_MASKS = [
+    ((1 << BOARD_SIZE) - 1) << (row * BOARD_SIZE) for row in range(BOARD_SIZE)
+]
+COLUMN_MASKS = [
+    sum(1 << (row * BOARD_SIZE + column) for row in range(BOARD_SIZE))
+    for column in range(BOARD_SIZE)
+]
+WINNING_LINES = ROW_MASKS + COLUMN_MASKS
+# Positions of the cells in each of the winning lines
+WINNING_LINE_POSITIONS = [
+    [position for position in range(BOARD_SIZE * BOARD_SIZE) if line & (1 << position)]
+    for line in WINNING_LINES
+]
+
+
+class Board:
+    """
+    A bingo board, stored as its values in row-major order, along with a
+    bitmask of which of those cells are marked.
+    """
+
+    __slots__ = ("values", "marked")
+
+    def __init__(self, values: Iterable[int]) -> None:
+        self.values = array("i", values)
+        self.marked = 0
+
+    def mark(self, position: int) -> bool:
+        """Marks the cell at `position`, and returns True if the board won."""
+        self.marked |= 1 << position
+        row_mask = ROW_MASKS[position // BOARD_SIZE]
+        column_mask = COLUMN_MASKS[position % BOARD_SIZE]
+        return (
+            self.marked & row_mask == row_mask
+            or self.marked & column_mask == column_mask
+        )
+
+    def has_won(self) -> bool:
+        return any(self.marked & line == line for line in WINNING_LINES)
+
+    def unmarked_sum(self) -> int:
+        return sum(
+            value
+            for position, value in enumerate(self.values)
+            if not self.marked & (1 << position)
+        )
 
 
 def parse_data(data: str) -> tuple[list[int], list[Board]]:
     nums_line, *blocks = data.split("\n\n")
     nums = [int(num) for num in nums_line.split(",")]
 
-    boards = [
-        [[Cell(int(num)) for num in row.split()] for row in block.splitlines()]
-        for block in blocks
-    ]
+    boards = [Board(int(num) for num in block.split()) for block in blocks]
     return nums, boards
 
 
-def part1(data: str) -> int:
-    nums, boards = parse_data(data)
-    for num in nums:
-        for board in boards:
-            for row in board:
-                for cell in row:
-                    if not cell.marked and cell.value == num:
-                        cell.marked = True
-
-                        if any(
-                            all(cell.marked for cell in row) for row in board
-                        ) or any(
-                            all(cell.marked for cell in column)
-                            for column in zip(*board)
-                        ):
-                            unmarked_nums = [
-                                cell.value
-                                for row in board
-                                for cell in row
-                                if not cell.marked
-                            ]
-                            return cell.value * sum(unmarked_nums)
-
-    return -1
+class BoardResult(NamedTuple):
+    turn: int
+    board_index: int
+    draw: int
+    score: int
 
 
-def part2(data: str) -> int:
-    nums, boards = parse_data(data)
+def play(nums: list[int], boards: list[Board]) -> Iterator[BoardResult]:
+    """
+    Plays bingo, yielding the result of every board as it wins.
+
+    Each drawn number only visits the cells holding it, and only the row
+    and column through a newly marked cell need to be checked for a win.
+    Boards start out unmarked, so the same boards can be played again.
+    """
+    cells_by_value: DefaultDict[int, list[tuple[int, int]]] = defaultdict(list)
+    for board_index, board in enumerate(boards):
+        board.marked = 0
+        for position, value in enumerate(board.values):
+            cells_by_value[value].append((board_index, position))
 
-    # Thing added over part1
     boards_won = [False for _ in boards]
 
-    for num in nums:
-        for board_index, board in enumerate(boards):
-            # Early exit: skip already won boards
+    for turn, num in enumerate(nums):
+        # Popping makes sure that a repeated draw doesn't mark cells twice
+        for board_index, position in cells_by_value.pop(num, []):
             if boards_won[board_index]:
                 continue
 
-            for row in board:
-                for cell in row:
-                    if not cell.marked and cell.value == num:
-                        cell.marked = True
-
-                        if any(
-                            all(cell.marked for cell in row) for row in board
-                        ) or any(
-                            all(cell.marked for cell in column)
-                            for column in zip(*board)
-                        ):
-                            # Added: when last board finally wins
-                            boards_won[board_index] = True
-                            if all(boards_won):
-                                unmarked_nums = [
-                                    cell.value
-                                    for row in board
-                                    for cell in row
-                                    if not cell.marked
-                                ]
-                                return cell.value * sum(unmarked_nums)
-
-    return -1
+            board = boards[board_index]
+            if board.mark(position):
+                boards_won[board_index] = True
+                score = num * board.unmarked_sum()
+                yield BoardResult(turn, board_index, num, score)
+
+
+def rank_boards(nums: list[int], boards: list[Board]) -> list[BoardResult]:
+    """Plays the game once, and returns every winning board in win order."""
+    return list(play(nums, boards))
+
+
+def first_score(ranking: list[BoardResult]) -> int:
+    return ranking[0].score if ranking else -1
+
+
+def last_score(ranking: list[BoardResult], board_count: int) -> int:
+    # There's no last board to win unless every board wins
+    return ranking[-1].score if len(ranking) == board_count else -1
+
+
+def part1(data: str) -> int:
+    nums, boards = parse_data(data)
+    # Only plays until the first board wins
+    result = next(play(nums, boards), None)
+    return result.score if result is not None else -1
+
+
+def part2(data: str) -> int:
+    nums, boards = parse_data(data)
+    return last_score(rank_boards(nums, boards), len(boards))
+
+
+def parse_data_numpy(
+    data: str,
+) -> tuple["npt.NDArray[np.int64]", "npt.NDArray[np.int64]"]:
+    """Returns the drawn numbers, and a (boards, rows, columns) value array."""
+    nums_line, _, boards_text = data.strip().partition("\n\n")
+    nums = np.array(nums_line.split(","), dtype=np.int64)
+
+    first_board = boards_text.split("\n\n", 1)[0].splitlines()
+    rows, columns = len(first_board), len(first_board[0].split())
+    boards = np.array(boards_text.split(), dtype=np.int64)
+    return nums, boards.reshape(-1, rows, columns)
+
+
+def play_numpy(data: str) -> list[BoardResult]:
+    """
+    Same as `play`, but computes every board's win turn at once: a line is
+    complete on the latest turn any of its numbers is drawn, and a board
+    wins on the earliest turn any of its lines is complete.
+
+    Like real bingo cards, each board is expected to hold distinct numbers.
+    """
+    if np is None:
+        return list(play(*parse_data(data)))
+
+    nums, boards = parse_data_numpy(data)
+    if len(nums) == 0 or len(boards) == 0:
+        return []
+
+    # Turn on which each cell's value is first drawn, with len(nums) for never.
+    never = len(nums)
+    drawn_values, first_turns = np.unique(nums, return_index=True)
+    indices = np.searchsorted(drawn_values, boards).clip(max=len(drawn_values) - 1)
+    is_drawn = drawn_values[indices] == boards
+    cell_turns = np.where(is_drawn, first_turns[indices], never)
+
+    row_turns = cell_turns.max(axis=2).min(axis=1)
+    column_turns = cell_turns.max(axis=1).min(axis=1)
+    win_turns = np.minimum(row_turns, column_turns)
+
+    # Stable, so that boards winning on the same turn stay in board order
+    order = np.argsort(win_turns, kind="stable")
+    order = order[win_turns[order] < never]
+
+    order_turns = win_turns[order]
+    unmarked = cell_turns[order] > order_turns[:, None, None]
+    unmarked_sums = (boards[order] * unmarked).sum(axis=(1, 2))
+    draws = nums[order_turns]
+    scores = draws * unmarked_sums
+    return [
+        BoardResult(*result)
+        for result in zip(
+            order_turns.tolist(), order.tolist(), draws.tolist(), scores.tolist()
+        )
+    ]
+
+
+def read_draws(file: TextIO) -> list[int]:
+    return [int(num) for num in file.readline().split(",")]
+
+
+def iter_boards(file: TextIO) -> Iterator[Board]:
+    """Lazily reads the boards that follow the line of draws in a file."""
+    values: list[int] = []
+    for line in file:
+        values.extend(int(num) for num in line.split())
+        if len(values) == BOARD_SIZE * BOARD_SIZE:
+            yield Board(values)
+            values = []
+
+
+# Set up once in every worker process by `_init_worker`
+_nums: list[int] = []
+_draw_turns: dict[int, int] = {}
+
+
+def _init_worker(nums: list[int]) -> None:
+    global _nums, _draw_turns
+    _nums = nums
+    _draw_turns = {}
+    for turn, num in enumerate(nums):
+        _draw_turns.setdefault(num, turn)
+
+
+def evaluate_board(
+    board: Board,
+    board_index: int,
+    nums: list[int],
+    draw_turns: dict[int, int],
+) -> Optional[BoardResult]:
+    """Finds the turn a board wins on and its score, without playing it out."""
+    never = len(nums)
+    cell_turns = [draw_turns.get(value, never) for value in board.values]
+    turn = min(
+        max(cell_turns[position] for position in positions)
+        for positions in WINNING_LINE_POSITIONS
+    )
+    if turn == never:
+        return None
+
+    unmarked_sum = sum(
+        value
+        for value, cell_turn in zip(board.values, cell_turns)
+        if cell_turn > turn
+    )
+    draw = nums[turn]
+    return BoardResult(turn, board_index, draw, draw * unmarked_sum)
+
+
+# The first and last boards to win in a batch, and whether all of them won
+BatchResult = tuple[Optional[BoardResult], Optional[BoardResult], bool]
+
+
+def _evaluate_batch(start_index: int, boards: list[Board]) -> BatchResult:
+    first = last = None
+    all_won = True
+    for board_index, board in enumerate(boards, start=start_index):
+        result = evaluate_board(board, board_index, _nums, _draw_turns)
+        if result is None:
+            all_won = False
+            continue
+
+        # Ties on the turn are broken by board index, like in `play`.
+        if first is None or result < first:
+            first = result
+        if last is None or result > last:
+            last = result
+
+    return first, last, all_won
+
+
+def solve_file_parallel(
+    filepath: str,
+    workers: Optional[int] = None,
+    batch_size: int = 10_000,
+) -> tuple[int, int]:
+    """
+    Returns both answers for a board file, reading boards lazily and
+    evaluating batches of them in a process pool. Only the first and last
+    winners seen so far are kept, so memory use doesn't grow with the file.
+    """
+    workers = workers or os.cpu_count() or 1
+    first: Optional[BoardResult] = None
+    last: Optional[BoardResult] = None
+    all_won = True
+
+    def collect(futures: Iterable["Future[BatchResult]"]) -> None:
+        nonlocal first, last, all_won
+        for future in futures:
+            batch_first, batch_last, batch_all_won = future.result()
+            all_won = all_won and batch_all_won
+            if batch_first is not None and (first is None or batch_first < first):
+                first = batch_first
+            if batch_last is not None and (last is None or batch_last > last):
+                last = batch_last
+
+    with open(filepath) as file:
+        nums = read_draws(file)
+        boards = iter_boards(file)
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker, initargs=(nums,)
+        ) as executor:
+            pending: set["Future[BatchResult]"] = set()
+            start_index = 0
+            while batch := list(islice(boards, batch_size)):
+                pending.add(executor.submit(_evaluate_batch, start_index, batch))
+                start_index += len(batch)
+
+                # Don't read further ahead than the workers can keep up with
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+            collect(pending)
+
+    first_score = first.score if first is not None else -1
+    # Like `part2`, there's no last board to win unless every board wins
+    last_score = last.score if last is not None and all_won else -1
+    return first_score, last_score
 
 
 test_data = """\
@@ -214,12 +450,100 @@ def test_part2() -> None:
     assert part2(test_data) == 1924
 
 
+def test_part2_not_all_boards_win() -> None:
+    nums_line, boards_text = test_data.split("\n\n", 1)
+    truncated_nums = nums_line[: nums_line.index(",10,")]
+    assert part2(truncated_nums + "\n\n" + boards_text) == -1
+
+
+def test_play() -> None:
+    nums, boards = parse_data(test_data)
+    assert [(result.board_index, result.score) for result in play(nums, boards)] == [
+        (2, 4512),
+        (0, 2192),
+        (1, 1924),
+    ]
+
+
+def test_board() -> None:
+    _, boards = parse_data(test_data)
+    board = boards[0]
+    assert board.values[:5].tolist() == [22, 13, 17, 11, 0]
+    assert not board.has_won()
+
+    # Marking the second column
+    assert not any(board.mark(position) for position in (1, 6, 11, 16))
+    assert board.mark(21)
+    assert board.has_won()
+    assert board.unmarked_sum() == 300 - (13 + 2 + 9 + 10 + 12)
+
+
+def test_play_numpy() -> None:
+    assert play_numpy(test_data) == rank_boards(*parse_data(test_data))
+
+
+def test_play_numpy_unusual_values() -> None:
+    # Huge and negative values, and a repeated draw
+    data = "5,-3,5,1000000000,8,7\n\n" + "\n".join(
+        " ".join(row)
+        for row in [
+            ["1000000000", "-3", "5", "7", "8"],
+            *[["9", "9", "9", "9", "9"]] * 4,
+        ]
+    )
+    assert play_numpy(data) == rank_boards(*parse_data(data))
+    assert play_numpy(data) == [
+        BoardResult(turn=5, board_index=0, draw=7, score=7 * 9 * 20)
+    ]
+
+
+def test_rank_boards() -> None:
+    nums, boards = parse_data(test_data)
+    ranking = rank_boards(nums, boards)
+    assert first_score(ranking) == 4512
+    assert last_score(ranking, len(boards)) == 1924
+    assert ranking == [
+        BoardResult(turn=11, board_index=2, draw=24, score=4512),
+        BoardResult(turn=13, board_index=0, draw=16, score=2192),
+        BoardResult(turn=14, board_index=1, draw=13, score=1924),
+    ]
+    # Ranking the same boards again plays a fresh game
+    assert rank_boards(nums, boards) == ranking
+
+
+def test_solve_file_parallel() -> None:
+    with tempfile.TemporaryDirectory() as tempdir:
+        filepath = os.path.join(tempdir, "input")
+        with open(filepath, "w") as file:
+            file.write(test_data)
+
+        with open(filepath) as file:
+            nums = read_draws(file)
+            boards = list(iter_boards(file))
+
+        _init_worker(nums)
+        assert _evaluate_batch(0, boards) == (
+            BoardResult(turn=11, board_index=2, draw=24, score=4512),
+            BoardResult(turn=14, board_index=1, draw=13, score=1924),
+            True,
+        )
+        assert solve_file_parallel(filepath, workers=2, batch_size=1) == (4512, 1924)
+
+        nums_line, boards_text = test_data.split("\n\n", 1)
+        with open(filepath, "w") as file:
+            file.write(nums_line[: nums_line.index(",10,")] + "\n\n" + boards_text)
+
+        assert solve_file_parallel(filepath, workers=2, batch_size=1) == (4512, -1)
+
+
 def main() -> None:
     with open(os.path.join(os.path.dirname(__file__), "input")) as file:
         data = file.read()
 
-    print(part1(data))
-    print(part2(data))
+    nums, boards = parse_data(data)
+    ranking = rank_boards(nums, boards)
+    print(first_score(ranking))
+    print(last_score(ranking, len(boards)))
 
 
 if __name__ == "__main__":
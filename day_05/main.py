@@ -90,11 +90,25 @@ Consider all of the lines. At how many points do at least two lines
 overlap?
 """
 import math
+import mmap
 import os
-from collections import defaultdict
-from typing import DefaultDict, Iterable
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, groupby, repeat
+from operator import add
+from types import TracebackType
+from typing import IO, DefaultDict, Iterable, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, we fall back to pure python without it
+    np = None  # type: ignore[assignment]
 
 Points = DefaultDict[tuple[int, int], int]
+Segment = tuple[int, int, int, int]
 
 
 def range_included(a: int, b: int) -> Iterable[int]:
@@ -110,12 +124,20 @@ def diagonal_range(x1: int, y1: int, x2: int, y2: int) -> list[tuple[int, int]]:
     return [(x, y) for x, y in zip(range_included(x1, x2), range_included(y1, y2))]
 
 
-def parse_data(data: str, consider_diagonals: bool = False) -> Points:
-    points: Points = defaultdict(int)
+def parse_segments(data: str) -> list[Segment]:
+    segments = []
     for line in data.splitlines():
         x1, y1, x2, y2 = (
             int(num) for coords in line.split("->") for num in coords.split(",")
         )
+        segments.append((x1, y1, x2, y2))
+
+    return segments
+
+
+def parse_data(data: str, consider_diagonals: bool = False) -> Points:
+    points: Points = defaultdict(int)
+    for x1, y1, x2, y2 in parse_segments(data):
         if x1 != x2 and y1 != y2:
             if not consider_diagonals:
                 continue
@@ -134,6 +156,496 @@ def parse_data(data: str, consider_diagonals: bool = False) -> Points:
     return points
 
 
+def flat_slice(x1: int, y1: int, x2: int, y2: int, width: int) -> slice:
+    """
+    Returns the slice of a flattened, row-major grid that covers a line.
+    Every line direction is just a different step along the flat grid.
+    """
+    start, end = y1 * width + x1, y2 * width + x2
+    if start > end:
+        start, end = end, start
+
+    length = max(abs(x2 - x1), abs(y2 - y1))
+    step = (end - start) // length if length else 1
+    return slice(start, end + 1, step)
+
+
+def grid_slices(segments: list[Segment]) -> tuple[int, list[slice]]:
+    """
+    Returns the size of a flat grid that fits all the segments, and the
+    slice of that grid for each segment.
+    """
+    if not segments:
+        return 0, []
+
+    min_x = min(min(x1, x2) for x1, _, x2, _ in segments)
+    min_y = min(min(y1, y2) for _, y1, _, y2 in segments)
+    width = max(max(x1, x2) for x1, _, x2, _ in segments) - min_x + 1
+    height = max(max(y1, y2) for _, y1, _, y2 in segments) - min_y + 1
+    slices = [
+        flat_slice(x1 - min_x, y1 - min_y, x2 - min_x, y2 - min_y, width)
+        for x1, y1, x2, y2 in segments
+    ]
+    return width * height, slices
+
+
+def _increment(counts: "array[int]", line_slice: slice) -> None:
+    counts[line_slice] = array("H", map(add, counts[line_slice], repeat(1)))
+
+
+def _count_at_least_two(counts: "array[int]") -> int:
+    return len(counts) - counts.count(0) - counts.count(1)
+
+
+def count_overlaps_dense(
+    segments: list[Segment],
+    consider_diagonals: bool = False,
+) -> int:
+    """
+    Same as counting the points from `parse_data`, but on a dense uint16
+    grid sized to fit the segments, with NumPy if it's installed.
+    """
+    if not consider_diagonals:
+        segments = [
+            (x1, y1, x2, y2) for x1, y1, x2, y2 in segments if x1 == x2 or y1 == y2
+        ]
+
+    size, slices = grid_slices(segments)
+    if np is not None:
+        grid = np.zeros(size, dtype=np.uint16)
+        for line_slice in slices:
+            grid[line_slice] += 1
+
+        return int(np.count_nonzero(grid >= 2))
+
+    counts = array("H", bytes(2 * size))
+    for line_slice in slices:
+        _increment(counts, line_slice)
+
+    return _count_at_least_two(counts)
+
+
+def solve(data: str) -> tuple[int, int]:
+    """
+    Returns the answers to both parts from a single parse. Horizontal and
+    vertical segments are counted on a base layer, and diagonals on a
+    separate layer that only part 2 adds on top.
+    """
+    segments = parse_segments(data)
+    size, slices = grid_slices(segments)
+    is_diagonal = [x1 != x2 and y1 != y2 for x1, y1, x2, y2 in segments]
+
+    if np is not None:
+        base = np.zeros(size, dtype=np.uint16)
+        diagonals = np.zeros(size, dtype=np.uint16)
+        for line_slice, diagonal in zip(slices, is_diagonal):
+            layer = diagonals if diagonal else base
+            layer[line_slice] += 1
+
+        part1_count = np.count_nonzero(base >= 2)
+        part2_count = np.count_nonzero(base + diagonals >= 2)
+        return int(part1_count), int(part2_count)
+
+    base_counts = array("H", bytes(2 * size))
+    diagonal_counts = array("H", bytes(2 * size))
+    for line_slice, diagonal in zip(slices, is_diagonal):
+        _increment(diagonal_counts if diagonal else base_counts, line_slice)
+
+    total_counts = array("H", map(add, base_counts, diagonal_counts))
+    return _count_at_least_two(base_counts), _count_at_least_two(total_counts)
+
+
+def clip_segment(segment: Segment, y_start: int, y_end: int) -> Optional[Segment]:
+    """Returns the part of a segment within the rows y_start <= y < y_end."""
+    x1, y1, x2, y2 = segment
+    if y1 > y2:
+        x1, y1, x2, y2 = x2, y2, x1, y1
+
+    if y2 < y_start or y1 >= y_end:
+        return None
+    if y1 == y2:
+        return x1, y1, x2, y2
+
+    # 0 for vertical segments, and 1 or -1 for diagonals
+    x_step = (x2 - x1) // (y2 - y1)
+    clipped_y1, clipped_y2 = max(y1, y_start), min(y2, y_end - 1)
+    return (
+        x1 + (clipped_y1 - y1) * x_step,
+        clipped_y1,
+        x1 + (clipped_y2 - y1) * x_step,
+        clipped_y2,
+    )
+
+
+# Set up once in every worker process by `_init_worker`
+_segments: list[Segment] = []
+
+
+def _init_worker(segments: list[Segment]) -> None:
+    global _segments
+    _segments = segments
+
+
+def _count_stripe(y_start: int, y_end: int) -> int:
+    clipped_segments = []
+    for segment in _segments:
+        clipped_segment = clip_segment(segment, y_start, y_end)
+        if clipped_segment is not None:
+            clipped_segments.append(clipped_segment)
+
+    # The grid only spans the clipped segments, so it fits inside the stripe
+    return count_overlaps_dense(clipped_segments, consider_diagonals=True)
+
+
+def count_overlaps_striped(
+    data: str,
+    consider_diagonals: bool = False,
+    stripe_height: int = 1024,
+    workers: Optional[int] = None,
+) -> int:
+    """
+    Same as counting the points from `parse_data`, but splits the plane into
+    horizontal stripes that are each rasterized by a worker process. Every
+    point belongs to exactly one stripe, so the counts add up exactly.
+    """
+    segments = [
+        (x1, y1, x2, y2)
+        for x1, y1, x2, y2 in parse_segments(data)
+        if consider_diagonals or x1 == x2 or y1 == y2
+    ]
+    if not segments:
+        return 0
+
+    min_y = min(min(y1, y2) for _, y1, _, y2 in segments)
+    max_y = max(max(y1, y2) for _, y1, _, y2 in segments)
+    stripe_starts = range(min_y, max_y + 1, stripe_height)
+    stripe_ends = [start + stripe_height for start in stripe_starts]
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(segments,)
+    ) as executor:
+        return sum(executor.map(_count_stripe, stripe_starts, stripe_ends))
+
+
+# Byte translation table that bumps a count, saturating at 2
+SATURATING_INCREMENT = bytes([1] + [2] * 255)
+
+
+class TiledGrid:
+    """
+    Sparse overlap counts, kept in square tiles of bytes that are only
+    allocated once a segment touches them. Counts saturate at 2, since
+    that's all that the puzzle cares about.
+
+    With `max_tiles` set, only that many tiles are kept in memory, and the
+    least recently used ones get spilled to a temporary memory-mapped file.
+    """
+
+    def __init__(self, tile_size: int = 256, max_tiles: Optional[int] = None) -> None:
+        if max_tiles is not None and max_tiles < 1:
+            raise ValueError(f"max_tiles must be at least 1, got {max_tiles}")
+
+        self.tile_size = tile_size
+        self.tile_area = tile_size * tile_size
+        self.max_tiles = max_tiles
+        # Tiles in memory, with the least recently used ones first
+        self.tiles: OrderedDict[tuple[int, int], bytearray] = OrderedDict()
+        # Slot of every spilled tile in the spill file
+        self.spilled: dict[tuple[int, int], int] = {}
+        self._free_slots: list[int] = []
+        self._slot_count = 0
+        self._spill_file: Optional[IO[bytes]] = None
+        self._spill_map: Optional[mmap.mmap] = None
+
+    def __enter__(self) -> "TiledGrid":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._spill_map is not None:
+            self._spill_map.close()
+            self._spill_map = None
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _spill_slot(self) -> tuple[mmap.mmap, int]:
+        """Returns the spill file's mapping and a free slot in it."""
+        if self._spill_map is None:
+            self._spill_file = tempfile.TemporaryFile()
+            self._spill_file.truncate(self.tile_area)
+            self._spill_map = mmap.mmap(self._spill_file.fileno(), self.tile_area)
+            self._slot_count = 1
+            self._free_slots = [0]
+
+        if not self._free_slots:
+            # Double the size of the file
+            self._spill_map.resize(2 * self._slot_count * self.tile_area)
+            self._free_slots = list(range(self._slot_count, 2 * self._slot_count))
+            self._slot_count *= 2
+
+        return self._spill_map, self._free_slots.pop()
+
+    def _get_tile(self, key: tuple[int, int]) -> bytearray:
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+
+        slot = self.spilled.pop(key, None)
+        if slot is not None:
+            assert self._spill_map is not None
+            offset = slot * self.tile_area
+            tile = bytearray(self._spill_map[offset : offset + self.tile_area])
+            self._free_slots.append(slot)
+        else:
+            tile = bytearray(self.tile_area)
+
+        self.tiles[key] = tile
+        if self.max_tiles is not None and len(self.tiles) > self.max_tiles:
+            cold_key, cold_tile = self.tiles.popitem(last=False)
+            spill_map, slot = self._spill_slot()
+            offset = slot * self.tile_area
+            spill_map[offset : offset + self.tile_area] = cold_tile
+            self.spilled[cold_key] = slot
+
+        return tile
+
+    def add_segment(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Bumps the counts along a segment, one tile-sized slice at a time."""
+        size = self.tile_size
+        x_step = (x2 > x1) - (x2 < x1)
+        y_step = (y2 > y1) - (y2 < y1)
+        length = max(abs(x2 - x1), abs(y2 - y1))
+
+        done = 0
+        while done <= length:
+            x, y = x1 + done * x_step, y1 + done * y_step
+            tile_x, local_x = divmod(x, size)
+            tile_y, local_y = divmod(y, size)
+
+            # How many more points of the segment are in this tile
+            steps = length - done
+            if x_step:
+                steps = min(steps, size - 1 - local_x if x_step > 0 else local_x)
+            if y_step:
+                steps = min(steps, size - 1 - local_y if y_step > 0 else local_y)
+
+            start = local_y * size + local_x
+            step = y_step * size + x_step
+            if step < 0:
+                start, step = start + steps * step, -step
+
+            tile = self._get_tile((tile_x, tile_y))
+            line_slice = slice(start, start + steps * step + 1, step or 1)
+            tile[line_slice] = tile[line_slice].translate(SATURATING_INCREMENT)
+            done += steps + 1
+
+    def count_overlaps(self) -> int:
+        count = sum(tile.count(2) for tile in self.tiles.values())
+        if self._spill_map is not None:
+            for slot in self.spilled.values():
+                offset = slot * self.tile_area
+                count += self._spill_map[offset : offset + self.tile_area].count(2)
+
+        return count
+
+
+def count_overlaps_tiled(
+    segments: list[Segment],
+    consider_diagonals: bool = False,
+    tile_size: int = 256,
+    max_tiles: Optional[int] = None,
+) -> int:
+    """Same as counting the points from `parse_data`, but on a `TiledGrid`."""
+    with TiledGrid(tile_size, max_tiles) as grid:
+        for x1, y1, x2, y2 in segments:
+            if consider_diagonals or x1 == x2 or y1 == y2:
+                grid.add_segment(x1, y1, x2, y2)
+
+        return grid.count_overlaps()
+
+
+# Every family of parallel lines is made of the lines `a*x + b*y = key`,
+# stored here as (a, b).
+Family = tuple[int, int]
+HORIZONTAL: Family = (0, 1)
+VERTICAL: Family = (1, 0)
+RISING: Family = (-1, 1)
+FALLING: Family = (1, 1)
+
+
+def segment_family(x1: int, y1: int, x2: int, y2: int) -> Family:
+    if x1 == x2:
+        return VERTICAL
+    if y1 == y2:
+        return HORIZONTAL
+    if x2 - x1 == y2 - y1:
+        return RISING
+    if x2 - x1 == y1 - y2:
+        return FALLING
+
+    raise ValueError(f"Line {(x1, y1, x2, y2)} is not at a multiple of 45 degrees")
+
+
+def line_key(family: Family, x: int, y: int) -> int:
+    """Returns which line of the family goes through (x, y)."""
+    a, b = family
+    return a * x + b * y
+
+
+def line_position(family: Family, x: int, y: int) -> int:
+    """Returns where (x, y) is along its line. Lattice points are 1 apart."""
+    return y if family == VERTICAL else x
+
+
+def intersection(
+    family1: Family,
+    key1: int,
+    family2: Family,
+    key2: int,
+) -> Optional[tuple[int, int]]:
+    """Returns where two lines cross, if they cross on a lattice point."""
+    (a1, b1), (a2, b2) = family1, family2
+    determinant = a1 * b2 - a2 * b1
+    x, x_remainder = divmod(key1 * b2 - key2 * b1, determinant)
+    y, y_remainder = divmod(a1 * key2 - a2 * key1, determinant)
+    if x_remainder or y_remainder:
+        return None
+
+    return x, y
+
+
+def multiply_covered(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Returns the inclusive ranges covered by two or more of the intervals."""
+    events = sorted(
+        [(start, 1) for start, _ in intervals] + [(end + 1, -1) for _, end in intervals]
+    )
+    covered = []
+    depth = 0
+    covered_start = 0
+    for position, position_events in groupby(events, key=lambda event: event[0]):
+        new_depth = depth + sum(change for _, change in position_events)
+        if depth < 2 <= new_depth:
+            covered_start = position
+        elif new_depth < 2 <= depth:
+            covered.append((covered_start, position - 1))
+
+        depth = new_depth
+
+    return covered
+
+
+def find_crossings(
+    family1: Family,
+    segments1: list[Segment],
+    family2: Family,
+    segments2: list[Segment],
+) -> set[tuple[int, int]]:
+    """
+    Returns the points where segments of two families cross.
+
+    Measured in the (key of family1, key of family2) coordinates, segments of
+    family1 are "vertical" and segments of family2 are "horizontal", so this
+    is the usual sweep over orthogonal segments: family2 segments are active
+    while the sweep is within their range, and each family1 segment looks up
+    the active segments within its own range.
+    """
+    # (sweep position, kind, ...) where kind is 0 to insert, 1 to query and
+    # 2 to remove, so that segments touching at their ends still cross.
+    events = []
+    for x1, y1, x2, y2 in segments2:
+        key = line_key(family2, x1, y1)
+        start, end = sorted((line_key(family1, x1, y1), line_key(family1, x2, y2)))
+        events.append((start, 0, key, key))
+        events.append((end, 2, key, key))
+    for x1, y1, x2, y2 in segments1:
+        key = line_key(family1, x1, y1)
+        start, end = sorted((line_key(family2, x1, y1), line_key(family2, x2, y2)))
+        events.append((key, 1, start, end))
+
+    events.sort()
+    crossings = set()
+    active_keys: list[int] = []
+    for position, kind, start, end in events:
+        if kind == 0:
+            insort(active_keys, start)
+        elif kind == 2:
+            del active_keys[bisect_left(active_keys, start)]
+        else:
+            first = bisect_left(active_keys, start)
+            last = bisect_right(active_keys, end)
+            # Equal keys are the same line, and so the same crossing point
+            for key in set(active_keys[first:last]):
+                point = intersection(family1, position, family2, key)
+                if point is not None:
+                    crossings.add(point)
+
+    return crossings
+
+
+def count_overlaps_analytic(
+    segments: list[Segment],
+    consider_diagonals: bool = False,
+) -> int:
+    """
+    Same as counting the points from `parse_data`, but without visiting
+    every point on the segments.
+
+    A point is covered twice either by overlapping segments along the same
+    line, or where segments of two different families cross. The first kind
+    is counted per line as ranges, and crossings are counted one at a time,
+    minus the ones that are already inside those ranges.
+    """
+    families: DefaultDict[Family, list[Segment]] = defaultdict(list)
+    for x1, y1, x2, y2 in segments:
+        family = segment_family(x1, y1, x2, y2)
+        if family in (RISING, FALLING) and not consider_diagonals:
+            continue
+
+        families[family].append((x1, y1, x2, y2))
+
+    lines: DefaultDict[tuple[Family, int], list[tuple[int, int]]] = defaultdict(list)
+    for family, family_segments in families.items():
+        for x1, y1, x2, y2 in family_segments:
+            start, end = sorted(
+                (line_position(family, x1, y1), line_position(family, x2, y2))
+            )
+            lines[family, line_key(family, x1, y1)].append((start, end))
+
+    overlaps = {line: multiply_covered(intervals) for line, intervals in lines.items()}
+    count = sum(
+        end - start + 1 for ranges in overlaps.values() for start, end in ranges
+    )
+
+    crossings: set[tuple[int, int]] = set()
+    for family1, family2 in combinations(families, 2):
+        crossings |= find_crossings(
+            family1, families[family1], family2, families[family2]
+        )
+
+    for x, y in crossings:
+        overlap_count = 0
+        for family in families:
+            ranges = overlaps.get((family, line_key(family, x, y)), [])
+            position = line_position(family, x, y)
+            index = bisect_right(ranges, (position, math.inf)) - 1
+            if index >= 0 and ranges[index][1] >= position:
+                overlap_count += 1
+
+        # Each crossing should be counted once in total
+        count += 1 - overlap_count
+
+    return count
+
+
 def part1(data: str) -> int:
     points = parse_data(data)
     return len([count for count in points.values() if count >= 2])
@@ -166,12 +678,61 @@ def test_part2() -> None:
     assert part2(test_data) == 12
 
 
+def test_count_overlaps_dense() -> None:
+    segments = parse_segments(test_data)
+    assert count_overlaps_dense(segments) == 5
+    assert count_overlaps_dense(segments, consider_diagonals=True) == 12
+
+
+def test_solve() -> None:
+    assert solve(test_data) == (5, 12)
+
+
+def test_count_overlaps_striped() -> None:
+    assert clip_segment((8, 0, 0, 8), 2, 5) == (6, 2, 4, 4)
+    assert clip_segment((7, 4, 7, 0), 3, 10) == (7, 3, 7, 4)
+    assert clip_segment((0, 9, 5, 9), 0, 9) is None
+
+    assert count_overlaps_striped(test_data, stripe_height=3, workers=2) == 5
+    assert count_overlaps_striped(test_data, True, stripe_height=3, workers=2) == 12
+
+
+def test_count_overlaps_tiled() -> None:
+    segments = parse_segments(test_data)
+    assert count_overlaps_tiled(segments) == 5
+    assert count_overlaps_tiled(segments, consider_diagonals=True) == 12
+    # Small tiles and a tiny memory cap, to make tiles spill and come back
+    assert count_overlaps_tiled(segments, True, tile_size=3, max_tiles=2) == 12
+
+    far_segments = [(10**9, 0, 10**9 + 5, 5), (10**9 + 5, 0, 10**9, 5)]
+    with TiledGrid(tile_size=4, max_tiles=1) as grid:
+        for segment in far_segments:
+            grid.add_segment(*segment)
+
+        assert len(grid.tiles) + len(grid.spilled) == 4
+        assert grid.count_overlaps() == 0
+
+
+def test_count_overlaps_analytic() -> None:
+    segments = parse_segments(test_data)
+    assert count_overlaps_analytic(segments) == 5
+    assert count_overlaps_analytic(segments, consider_diagonals=True) == 12
+
+    # Diagonals of different parity never cross on a lattice point
+    assert count_overlaps_analytic([(0, 0, 3, 3), (0, 3, 3, 0)], True) == 0
+    assert count_overlaps_analytic([(0, 0, 2, 2), (0, 2, 2, 0)], True) == 1
+    # A crossing inside an overlap is only counted once
+    segments = [(0, 1, 4, 1), (2, 1, 6, 1), (3, 0, 3, 2), (0, 0, 4, 4)]
+    assert count_overlaps_analytic(segments, consider_diagonals=True) == 4
+
+
 def main() -> None:
     with open(os.path.join(os.path.dirname(__file__), "input")) as file:
         data = file.read()
 
-    print(part1(data))
-    print(part2(data))
+    answer1, answer2 = solve(data)
+    print(answer1)
+    print(answer2)
 
 
 if __name__ == "__main__":